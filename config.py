@@ -12,6 +12,9 @@ suppress_warnings=true
 
 [plaid-sync]
 dbfile = /data/transactions.db
+; optional - open the database through an alternate SQLite VFS (not provided)
+; sqlite_vfs = myvfs
+; sqlite_vfs_extension = /path/to/myvfs_extension.so
 
 [Account1]
 access_token = access-development-xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx
@@ -46,6 +49,18 @@ class Config:
     def get_dbfile(self) -> str:
         return self.config['plaid-sync']['dbfile']
 
+    def get_db_options(self) -> dict:
+        """
+        Optional SQLite tuning. sqlite_vfs names an alternate VFS to open the
+        database with, and sqlite_vfs_extension is a loadable extension to
+        register it from when it isn't built into SQLite. Neither is provided
+        here; TransactionsDB falls back to the default VFS if they don't work.
+        """
+        return {
+            'vfs': self.config['plaid-sync'].get('sqlite_vfs'),
+            'vfs_extension': self.config['plaid-sync'].get('sqlite_vfs_extension'),
+        }
+
     def get_all_config_sections(self) -> str:
         """
         Returns all defined configuration sections, not just accounts
@@ -1,15 +1,20 @@
 #!.env/bin/python
 
 import argparse
+import concurrent.futures
+import dataclasses
 import datetime
+import itertools
 import sys
-from collections import namedtuple
 
 import config
 import plaidapi
 import transactionsdb
 from plaidapi import PlaidAccountUpdateNeeded, PlaidError
 
+# upper bound on accounts synced concurrently
+MAX_SYNC_WORKERS = 8
+
 
 def parse_options():
     parser = argparse.ArgumentParser(
@@ -97,23 +102,48 @@ def parse_options():
     return args
 
 
-class SyncCounts(
-    namedtuple(
-        "SyncCounts",
-        [
-            "new",
-            "new_pending",
-            "archived",
-            "archived_pending",
-            "total_fetched",
-            "accounts",
-        ],
+@dataclasses.dataclass(frozen=True)
+class SyncCounts:
+    # declared by hand rather than dataclass(slots=True), which needs 3.10
+    __slots__ = (
+        "new",
+        "new_pending",
+        "archived",
+        "archived_pending",
+        "total_fetched",
+        "accounts",
+    )
+
+    new: int
+    new_pending: int
+    archived: int
+    archived_pending: int
+    total_fetched: int
+    accounts: int
+
+
+def print_sync_progress(added, modified, removed, has_next):
+    print(
+        f"        {added} added, {modified} modified, {removed} removed (more: {has_next})"
     )
-):
-    pass
+
+
+def print_fetch_progress(fetched, total):
+    print(f"        {fetched}/{total} fetched")
 
 
 class PlaidSynchronizer:
+    __slots__ = (
+        "pending",
+        "db",
+        "plaid",
+        "account_name",
+        "access_token",
+        "plaid_error",
+        "item_info",
+        "counts",
+    )
+
     def __init__(
         self,
         db: transactionsdb.TransactionsDB,
@@ -121,7 +151,7 @@ class PlaidSynchronizer:
         account_name: str,
         access_token: str,
     ):
-        self.transactions = {}
+        self.pending = {}
         self.db = db
         self.plaid = plaid
         self.account_name = account_name
@@ -131,18 +161,11 @@ class PlaidSynchronizer:
         self.counts = SyncCounts(0, 0, 0, 0, 0, 0)
 
     def add_transactions(self, transactions):
-        self.transactions.update(
-            dict(map(lambda t: (t.transaction_id, t), transactions))
-        )
+        # only the pending flag is needed after a transaction has been saved
+        self.pending.update((t.transaction_id, t.pending) for t in transactions)
 
     def count_pending(self, tids):
-        return len(
-            [
-                tid
-                for tid in tids
-                if self.transactions.get(tid) and self.transactions[tid].pending
-            ]
-        )
+        return sum(1 for tid in tids if self.pending.get(tid))
 
     def sync_with_cursor(self, fetch_balances=True, verbose=False):
         """
@@ -151,7 +174,7 @@ class PlaidSynchronizer:
         """
         try:
             if verbose:
-                print("Account: %s (using cursor-based sync)" % self.account_name)
+                print(f"Account: {self.account_name} (using cursor-based sync)")
                 print("    Fetching item (bank login) info")
             self.item_info = self.plaid.get_item_info(self.access_token)
 
@@ -174,13 +197,7 @@ class PlaidSynchronizer:
             sync_result = self.plaid.sync_transactions(
                 access_token=self.access_token,
                 cursor=last_cursor,
-                status_callback=(
-                    lambda added, modified, removed, has_next: print(
-                        f"        {len(added)} added, {len(modified)} modified, {len(removed)} removed (more: {has_next})"
-                    )
-                )
-                if verbose
-                else None,
+                status_callback=print_sync_progress if verbose else None,
             )
 
             # Process added transactions
@@ -191,11 +208,10 @@ class PlaidSynchronizer:
             self.add_transactions(added_transactions)
             self.add_transactions(modified_transactions)
 
-            account_ids = set()
-            if added_transactions or modified_transactions:
-                account_ids = set(
-                    t.account_id for t in added_transactions + modified_transactions
-                )
+            account_ids = {
+                t.account_id
+                for t in itertools.chain(added_transactions, modified_transactions)
+            }
 
             self.counts = SyncCounts(
                 new=len(added_transactions),
@@ -210,14 +226,10 @@ class PlaidSynchronizer:
 
             if verbose:
                 print(
-                    "    Synced %d added (%d pending), %d modified, %d removed transactions from %d accounts"
-                    % (
-                        self.counts.new,
-                        self.counts.new_pending,
-                        len(modified_transactions),
-                        len(removed_transaction_ids),
-                        self.counts.accounts,
-                    )
+                    f"    Synced {self.counts.new} added ({self.counts.new_pending} pending), "
+                    f"{len(modified_transactions)} modified, "
+                    f"{len(removed_transaction_ids)} removed transactions "
+                    f"from {self.counts.accounts} accounts"
                 )
 
             # Archive/remove transactions that were removed
@@ -226,34 +238,41 @@ class PlaidSynchronizer:
             #         print("    Removing %d transactions" % len(removed_transaction_ids))
             #     self.db.archive_transactions(removed_transaction_ids)
 
+            # The steady state for a cursor sync is no changes at all - skip the
+            # write transaction entirely when there is nothing new to record
+            if not (
+                added_transactions
+                or modified_transactions
+                or removed_transaction_ids
+                or balances
+                or sync_result["cursor"] != last_cursor
+            ):
+                if verbose:
+                    print("    No changes since last sync, nothing to save")
+                return
+
             if verbose:
                 print(
-                    "    Saving %d balances, %d new transactions, %d modified transactions"
-                    % (
-                        len(balances) if balances else 0,
-                        len(added_transactions),
-                        len(modified_transactions),
-                    )
+                    f"    Saving {len(balances) if balances else 0} balances, "
+                    f"{len(added_transactions)} new transactions, "
+                    f"{len(modified_transactions)} modified transactions"
                 )
 
-            # Save data to database
-            self.db.save_item_info(self.item_info)
-
-            if balances:
-                for balance in balances:
-                    self.db.save_balance(self.item_info.item_id, balance)
+            # Save data to database, committing everything at once
+            with self.db.transaction():
+                self.db.save_item_info(self.item_info)
 
-            # Save new and modified transactions
-            for transaction in added_transactions:
-                self.db.save_transaction(transaction)
+                if balances:
+                    self.db.save_balances(self.item_info.item_id, balances)
 
-            for transaction in modified_transactions:
-                self.db.save_transaction(
-                    transaction
-                )  # This should update existing records
+                # Save new and modified transactions - save_transactions upserts,
+                # so modified transactions update their existing records
+                self.db.save_transactions(
+                    itertools.chain(added_transactions, modified_transactions)
+                )
 
-            # Save the cursor for next sync
-            self.db.save_sync_cursor(self.item_info.item_id, sync_result["cursor"])
+                # Save the cursor for next sync
+                self.db.save_sync_cursor(self.item_info.item_id, sync_result["cursor"])
 
         except plaidapi.PlaidError as ex:
             self.plaid_error = ex
@@ -273,7 +292,7 @@ class PlaidSynchronizer:
         # Original date-range based sync method
         try:
             if verbose:
-                print("Account: %s" % self.account_name)
+                print(f"Account: {self.account_name}")
                 print("    Fetching item (bank login) info")
             self.item_info = self.plaid.get_item_info(self.access_token)
 
@@ -284,32 +303,44 @@ class PlaidSynchronizer:
                 balances = self.plaid.get_account_balance(self.access_token)
 
             if verbose:
-                print(
-                    "    Fetching transactions from %s to %s" % (start_date, end_date)
-                )
+                print(f"    Fetching transactions from {start_date} to {end_date}")
 
-            self.add_transactions(
-                self.plaid.get_transactions(
-                    access_token=self.access_token,
-                    start_date=start_date,
-                    end_date=end_date,
-                    status_callback=(
-                        lambda c, t: print("        %d/%d fetched" % (c, t))
-                    )
-                    if verbose
-                    else None,
-                )
-            )
+            # each page is checked against what's stored and its new
+            # transactions saved as soon as it arrives
+            account_ids = set()
+            tids_new = set()
+            for transactions_batch in self.plaid.iter_transactions(
+                access_token=self.access_token,
+                start_date=start_date,
+                end_date=end_date,
+                status_callback=print_fetch_progress if verbose else None,
+            ):
+                self.add_transactions(transactions_batch)
+                account_ids.update(t.account_id for t in transactions_batch)
 
-            account_ids = set(t.account_id for t in self.transactions.values())
-            tids_existing = set(
-                self.db.get_transaction_ids(start_date, end_date, list(account_ids))
+                self.db.load_transaction_id_lookup(
+                    t.transaction_id for t in transactions_batch
+                )
+                tids_stored = frozenset(
+                    self.db.get_stored_lookup_ids(start_date, end_date)
+                )
+                new_batch = [
+                    t for t in transactions_batch if t.transaction_id not in tids_stored
+                ]
+                if new_batch:
+                    tids_new.update(t.transaction_id for t in new_batch)
+                    with self.db.transaction():
+                        self.db.save_transactions(new_batch)
+
+            # whatever is stored for these accounts but wasn't fetched again
+            tids_fetched = frozenset(self.pending)
+            self.db.load_transaction_id_lookup(tids_fetched)
+            archive_pending = self.db.get_pending_not_in_lookup(
+                start_date, end_date, list(account_ids)
             )
-            tids_fetched = set(self.transactions.keys())
-            tids_new = tids_fetched.difference(tids_existing)
-            tids_to_archive = tids_existing.difference(tids_fetched)
+            tids_to_archive = frozenset(archive_pending)
 
-            self.add_transactions(self.db.fetch_transactions_by_id(tids_to_archive))
+            self.pending.update(archive_pending)
 
             self.counts = SyncCounts(
                 new=len(tids_new),
@@ -322,15 +353,11 @@ class PlaidSynchronizer:
 
             if verbose:
                 print(
-                    "    Fetched %d new (%d pending), %d to archive (%d were pending), %d total transactions from %d accounts"
-                    % (
-                        self.counts.new,
-                        self.counts.new_pending,
-                        self.counts.archived,
-                        self.counts.archived_pending,
-                        self.counts.total_fetched,
-                        self.counts.accounts,
-                    )
+                    f"    Fetched {self.counts.new} new ({self.counts.new_pending} pending), "
+                    f"{self.counts.archived} to archive "
+                    f"({self.counts.archived_pending} were pending), "
+                    f"{self.counts.total_fetched} total transactions "
+                    f"from {self.counts.accounts} accounts"
                 )
 
             # if verbose:
@@ -340,19 +367,13 @@ class PlaidSynchronizer:
             #     self.db.archive_transactions(list(tids_to_archive))
 
             if verbose:
-                print(
-                    "    Saving %d balances, %d transactions"
-                    % (len(balances), len(tids_new))
-                )
+                print(f"    Saving {len(balances) if balances else 0} balances")
 
-            self.db.save_item_info(self.item_info)
+            with self.db.transaction():
+                self.db.save_item_info(self.item_info)
 
-            if balances:
-                for balance in balances:
-                    self.db.save_balance(self.item_info.item_id, balance)
-
-            for tid in tids_new:
-                self.db.save_transaction(self.transactions[tid])
+                if balances:
+                    self.db.save_balances(self.item_info.item_id, balances)
 
         except plaidapi.PlaidError as ex:
             self.plaid_error = ex
@@ -371,25 +392,26 @@ def update_account(cfg: config.Config, plaid: plaidapi.PlaidAPI, account_name: s
     try:
         print("Starting account update process for [%s]" % account_name)
 
-        if account_name not in cfg.get_enabled_accounts():
+        accounts = cfg.get_enabled_accounts()
+        if account_name not in accounts:
             print("Unknown account name [%s]." % account_name, file=sys.stderr)
             print("Configured accounts: ", file=sys.stderr)
-            for account in cfg.get_enabled_accounts():
+            for account in accounts:
                 print("    %s" % account, file=sys.stderr)
             sys.exit(1)
 
+        access_token = cfg.get_account_access_token(account_name)
+
         if cfg.environment == "sandbox":
             print("\nSandbox mode. Resetting credentials prior to update.\n")
             try:
-                plaid.sandbox_reset_login(cfg.get_account_access_token(account_name))
+                plaid.sandbox_reset_login(access_token)
             except PlaidAccountUpdateNeeded:
                 # the point is to get it into this state
                 # so just ignore and proceed
                 pass
 
-        link_token = plaid.get_link_token(
-            access_token=cfg.get_account_access_token(account_name)
-        )
+        link_token = plaid.get_link_token(access_token=access_token)
 
         import webserver
 
@@ -496,7 +518,7 @@ def link_account(cfg: config.Config, plaid: plaidapi.PlaidAPI, account_name: str
 def main():
     args = parse_options()
     cfg = config.Config(args.config_file)
-    db = transactionsdb.TransactionsDB(cfg.get_dbfile())
+    db = transactionsdb.TransactionsDB(cfg.get_dbfile(), **cfg.get_db_options())
     plaid = plaidapi.PlaidAPI(**cfg.get_plaid_client_config())
 
     if args.update_account:
@@ -507,7 +529,8 @@ def main():
         link_account(cfg, plaid, args.link_account)
         return
 
-    if not cfg.get_enabled_accounts():
+    accounts = cfg.get_enabled_accounts()
+    if not accounts:
         print(
             "There are no configured Plaid accounts in the specified "
             "configuration file."
@@ -516,12 +539,10 @@ def main():
         print("Re-run with --link-account to add one.")
         sys.exit(1)
 
-    results = {}
+    access_tokens = {name: cfg.get_account_access_token(name) for name in accounts}
 
     def process_account(account_name):
-        sync = PlaidSynchronizer(
-            db, plaid, account_name, cfg.get_account_access_token(account_name)
-        )
+        sync = PlaidSynchronizer(db, plaid, account_name, access_tokens[account_name])
         if args.date_range_sync:
             sync.sync(
                 args.start_date,
@@ -538,81 +559,76 @@ def main():
                 verbose=args.verbose,
                 use_cursor_sync=True,
             )
-        results[account_name] = sync
-
-    tqdm = try_get_tqdm() if not args.verbose else None
-    if tqdm:
-        sync_type = "date-range" if args.date_range_sync else "cursor-based"
-        for account_name in tqdm(
-            cfg.get_enabled_accounts(),
-            desc=f"Synchronizing Plaid accounts ({sync_type})",
-            leave=False,
-        ):
-            process_account(account_name)
-    else:
-        for account_name in cfg.get_enabled_accounts():
-            process_account(account_name)
+        return sync
+
+    # accounts are independent and mostly waiting on Plaid, so sync them
+    # concurrently - except in verbose mode, where the per-account status
+    # messages would otherwise interleave
+    workers = 1 if args.verbose else min(MAX_SYNC_WORKERS, len(accounts))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_account, name) for name in accounts]
+
+        tqdm = try_get_tqdm() if not args.verbose else None
+        if tqdm:
+            sync_type = "date-range" if args.date_range_sync else "cursor-based"
+            for future in tqdm(
+                concurrent.futures.as_completed(futures),
+                total=len(futures),
+                desc=f"Synchronizing Plaid accounts ({sync_type})",
+                leave=False,
+            ):
+                future.result()
+
+        results = {
+            account_name: future.result()
+            for account_name, future in zip(accounts, futures)
+        }
 
     print("")
     print("")
     sync_type = "date-range" if args.date_range_sync else "cursor-based"
-    print(
-        "Finished syncing %d Plaid accounts using %s sync" % (len(results), sync_type)
-    )
+    print(f"Finished syncing {len(results)} Plaid accounts using {sync_type} sync")
     print("")
     for account_name, sync in results.items():
         print(
-            "%-50s: %2d new transactions (%d pending), %2d archived transactions over %d accounts"
-            % (
-                account_name,
-                sync.counts.new,
-                sync.counts.new_pending,
-                sync.counts.archived,
-                sync.counts.accounts,
-            )
+            f"{account_name:<50}: {sync.counts.new:2d} new transactions "
+            f"({sync.counts.new_pending} pending), "
+            f"{sync.counts.archived:2d} archived transactions "
+            f"over {sync.counts.accounts} accounts"
         )
 
         if sync.plaid_error:
             import textwrap
 
-            print("%50s: *** Plaid Error ***" % "")
+            print(f"{'':50}: *** Plaid Error ***")
             for i, line in enumerate(textwrap.wrap(str(sync.plaid_error), width=40)):
-                print("%50s: %s" % ("", line))
+                print(f"{'':50}: {line}")
             if isinstance(sync.plaid_error, plaidapi.PlaidAccountUpdateNeeded):
-                print("%50s: *** re-run with: ***" % "")
-                print("%50s: --update '%s'" % ("", account_name))
-                print("%50s: to fix" % "")
+                print(f"{'':50}: *** re-run with: ***")
+                print(f"{'':50}: --update '{account_name}'")
+                print(f"{'':50}: to fix")
 
     # check for any out of date accounts
     if sync_type == "date-range":
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        stale_cutoff = now - datetime.timedelta(days=3)
+
         for account_name, sync in results.items():
             if not sync.item_info:
                 continue
 
-            now = datetime.datetime.now(tz=datetime.timezone.utc)
+            failed = sync.item_info.ts_last_failed_update
+            success = sync.item_info.ts_last_successful_update
 
-            if (
-                sync.item_info.ts_last_failed_update
-                > sync.item_info.ts_last_successful_update
-            ):
+            if failed > success:
                 print(
-                    "%-50s: Last attempt failed!  Last failure: %s  Last success: %s"
-                    % (
-                        account_name,
-                        sync.item_info.ts_last_failed_update,
-                        sync.item_info.ts_last_successful_update,
-                    )
+                    f"{account_name:<50}: Last attempt failed!  "
+                    f"Last failure: {failed}  Last success: {success}"
                 )
-            elif sync.item_info.ts_last_successful_update < (
-                now - datetime.timedelta(days=3)
-            ):
+            elif success < stale_cutoff:
                 print(
-                    "%-50s: Last successful update > 3 days ago!  Last failure: %s  Last success: %s"
-                    % (
-                        account_name,
-                        sync.item_info.ts_last_failed_update,
-                        sync.item_info.ts_last_successful_update,
-                    )
+                    f"{account_name:<50}: Last successful update > 3 days ago!  "
+                    f"Last failure: {failed}  Last success: {success}"
                 )
 
 
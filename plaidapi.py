@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
 
 import re
+import asyncio
+import collections
+import concurrent.futures
+import dataclasses
 import datetime
+import functools
+import inspect
+import json
+import logging
+import operator
+import random
+import time
 
 import plaid
 from plaid.api import plaid_api
-from typing import Optional, List
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, List, Union
 from plaid.model.item_public_token_exchange_request import (
     ItemPublicTokenExchangeRequest,
 )
@@ -20,46 +31,195 @@ from plaid.model.transactions_get_request_options import TransactionsGetRequestO
 from plaid.model.transactions_sync_request import TransactionsSyncRequest
 from plaid.model.sandbox_item_reset_login_request import SandboxItemResetLoginRequest
 
+try:
+    import httpx
+except ImportError:  # optional, only needed for AsyncPlaidAPI
+    httpx = None
 
+try:
+    import h2  # noqa: F401
+except ImportError:  # optional, lets AsyncPlaidAPI multiplex over HTTP/2
+    h2 = None
+
+try:
+    import orjson
+except ImportError:  # optional, faster JSON decoding for AsyncPlaidAPI
+    orjson = None
+
+# kept-alive HTTPS connections to Plaid held open for reuse
+CONNECTION_POOL_MAXSIZE = 32
+
+# seconds to wait on a single Plaid REST call from AsyncPlaidAPI
+REQUEST_TIMEOUT = 60.0
+
+# Plaid requests AsyncPlaidAPI keeps in flight at once
+MAX_CONCURRENT_REQUESTS = 8
+
+# attempts made at a rate limited Plaid request before giving up, with
+# jittered exponential backoff capped at RATE_LIMIT_MAX_BACKOFF seconds between
+RATE_LIMIT_ATTEMPTS = 5
+RATE_LIMIT_MAX_BACKOFF = 30
+
+log = logging.getLogger(__name__)
+
+# generated enum models validate on construction, so build these once
+_US = CountryCode("US")
+_PRODUCTS_TXN = [Products("transactions")]
+
+
+def plain_dict(data) -> dict:
+    """
+    The dict form of a Plaid payload, which is either already a dict or a
+    generated plaid model.
+    """
+    if isinstance(data, dict):
+        return data
+    return data.to_dict()
+
+
+# field extractors for the wrappers below; itemgetter does all the lookups in
+# one C call
+_BALANCE_GET = operator.itemgetter("account_id", "name", "type", "subtype", "mask")
+_BALANCE_AMOUNTS_GET = operator.itemgetter(
+    "current", "available", "limit", "iso_currency_code"
+)
+_ITEM_GET = operator.itemgetter("item_id", "institution_id", "consent_expiration_time")
+_ITEM_STATUS_GET = operator.itemgetter("last_failed_update", "last_successful_update")
+# merchant_name and personal_finance_category are optional, and left out of
+# the generated model's to_dict() when unset, so they're read with .get
+_TXN_GET = operator.itemgetter(
+    "account_id", "date", "transaction_id", "pending", "amount", "iso_currency_code"
+)
+
+
+@dataclasses.dataclass(frozen=True)
 class AccountBalance:
-    def __init__(self, data):
-        self.raw_data = data
-        self.account_id = data["account_id"]
-        self.account_name = data["name"]
-        self.account_type = data["type"]
-        self.account_subtype = data["subtype"]
-        self.account_number = data["mask"]
-        self.balance_current = data["balances"]["current"]
-        self.balance_available = data["balances"]["available"]
-        self.balance_limit = data["balances"]["limit"]
-        self.currency_code = data["balances"]["iso_currency_code"]
+    __slots__ = (
+        "account_id",
+        "account_name",
+        "account_type",
+        "account_subtype",
+        "account_number",
+        "balance_current",
+        "balance_available",
+        "balance_limit",
+        "currency_code",
+        "_data",
+    )
+
+    account_id: str
+    account_name: str
+    account_type: Any
+    account_subtype: Any
+    account_number: Optional[str]
+    balance_current: Optional[float]
+    balance_available: Optional[float]
+    balance_limit: Optional[float]
+    currency_code: Optional[str]
+    data: dataclasses.InitVar[dict]
+
+    def __post_init__(self, data):
+        object.__setattr__(self, "_data", data)
+
+    @classmethod
+    def from_api(cls, data) -> "AccountBalance":
+        data = plain_dict(data)
+        return cls(*_BALANCE_GET(data), *_BALANCE_AMOUNTS_GET(data["balances"]), data)
+
+    @property
+    def raw_data(self) -> dict:
+        return self._data
 
 
 class AccountInfo:
     def __init__(self, data):
         self.raw_data = data
-        self.item_id = data["item"]["item_id"]
-        self.institution_id = data["item"]["institution_id"]
-        self.ts_consent_expiration = data["item"]["consent_expiration_time"]
-        self.ts_last_failed_update = data["status"]["transactions"][
-            "last_failed_update"
-        ]
-        self.ts_last_successful_update = data["status"]["transactions"][
-            "last_successful_update"
-        ]
+        (
+            self.item_id,
+            self.institution_id,
+            self.ts_consent_expiration,
+        ) = _ITEM_GET(data["item"])
+        (
+            self.ts_last_failed_update,
+            self.ts_last_successful_update,
+        ) = _ITEM_STATUS_GET(data["status"]["transactions"])
+
+
+@dataclasses.dataclass(frozen=True)
+class Transaction:
+    """
+    Built by from_api from either a generated plaid Transaction model or the
+    equivalent dict from the REST API or the database. A model is converted to
+    its dict form once there and not kept, and dates are parsed, so fields
+    have the same types from any source. Serializing the dict is left to
+    whoever stores it. A fetched transaction equals its stored copy and equal
+    transactions hash alike, so they can be deduplicated with a set.
+    """
+
+    __slots__ = (
+        "account_id",
+        "date",
+        "transaction_id",
+        "pending",
+        "amount",
+        "currency_code",
+        "merchant_name",
+        "personal_finance_category",
+        "_data",
+    )
+
+    account_id: str
+    date: datetime.date
+    transaction_id: str
+    pending: bool
+    amount: float
+    currency_code: Optional[str]
+    merchant_name: Optional[str]
+    personal_finance_category: Optional[dict]
+    data: dataclasses.InitVar[dict]
+
+    def __post_init__(self, data):
+        object.__setattr__(self, "_data", data)
+
+    def __hash__(self):
+        # personal_finance_category is a dict, leave it out
+        return hash(
+            (
+                self.account_id,
+                self.date,
+                self.transaction_id,
+                self.pending,
+                self.amount,
+                self.currency_code,
+                self.merchant_name,
+            )
+        )
 
+    @classmethod
+    def from_api(cls, data) -> "Transaction":
+        data = plain_dict(data)
+        account_id, date, transaction_id, pending, amount, currency_code = _TXN_GET(
+            data
+        )
+        if isinstance(date, str):
+            # the generated model parses dates, plain JSON leaves them as strings
+            date = datetime.date.fromisoformat(date)
+
+        return cls(
+            account_id,
+            date,
+            transaction_id,
+            pending,
+            amount,
+            currency_code,
+            data.get("merchant_name"),
+            data.get("personal_finance_category"),
+            data,
+        )
 
-class Transaction:
-    def __init__(self, data):
-        self.raw_data = data
-        self.account_id = data["account_id"]
-        self.date = data["date"]
-        self.transaction_id = data["transaction_id"]
-        self.pending = data["pending"]
-        self.merchant_name = data["merchant_name"]
-        self.amount = data["amount"]
-        self.currency_code = data["iso_currency_code"]
-        self.personal_finance_category = data["personal_finance_category"]
+    @property
+    def raw_data(self) -> dict:
+        return self._data
 
     def __str__(self):
         return "%s %s %s - %4.2f %s" % (
@@ -71,6 +231,9 @@ class Transaction:
         )
 
 
+_MS_Z_RE = re.compile(r"(\.\d+)?Z$")
+
+
 def parse_optional_iso8601_timestamp(ts: Optional[str]) -> datetime.datetime:
     if ts is None:
         return None
@@ -78,19 +241,69 @@ def parse_optional_iso8601_timestamp(ts: Optional[str]) -> datetime.datetime:
     # which fromisoformat hates - it also hates "Z", so strip those off from this
     # string (the milliseconds hardly matter for this purpose, and I'd rather avoid
     # having to pull dateutil JUST for this parsing)
-    return datetime.datetime.fromisoformat(re.sub(r"[.][0-9]+Z", "+00:00", ts))
+    if ts.endswith("Z"):
+        ts = _MS_Z_RE.sub("+00:00", ts)
+    return datetime.datetime.fromisoformat(ts)
+
+
+def plaid_error_body(ex: plaid.ApiException) -> dict:
+    """
+    The error object Plaid sends back in the response body, e.g.
+    {"error_type": "ITEM_ERROR", "error_code": "ITEM_LOGIN_REQUIRED", ...},
+    or an empty dict if the body isn't one.
+    """
+    try:
+        body = json.loads(ex.body)
+    except (TypeError, ValueError):
+        return {}
+    return body if isinstance(body, dict) else {}
 
 
 def raise_plaid(ex: plaid.ApiException):
-    if ex.reason == "NO_ACCOUNTS":
+    # ex.reason is the HTTP reason phrase, the Plaid error code is in the body
+    error_code = plaid_error_body(ex).get("error_code", ex.reason)
+
+    if ex.status == 429:
+        raise PlaidRateLimited(ex)
+    elif error_code == "NO_ACCOUNTS":
         raise PlaidNoApplicableAccounts(ex)
-    elif ex.reason == "ITEM_LOGIN_REQUIRED":
+    elif error_code == "ITEM_LOGIN_REQUIRED":
         raise PlaidAccountUpdateNeeded(ex)
     else:
         raise PlaidUnknownError(ex)
 
 
+def rate_limit_backoff(attempt: int) -> float:
+    return min(2**attempt, RATE_LIMIT_MAX_BACKOFF) + random.random() * 0.5
+
+
+def call_with_backoff(call, *args):
+    """
+    Makes a generated client call, retrying it with backoff while Plaid
+    answers 429 (error_type RATE_LIMIT_EXCEEDED), so a burst of requests
+    slows down instead of failing the sync.
+    """
+    for attempt in range(RATE_LIMIT_ATTEMPTS - 1):
+        try:
+            return call(*args)
+        except plaid.ApiException as ex:
+            if ex.status != 429:
+                raise
+        time.sleep(rate_limit_backoff(attempt))
+    return call(*args)
+
+
 def wrap_plaid_error(f):
+    if inspect.isgeneratorfunction(f):
+        # errors from a generator only surface while it is being iterated
+        def wrap_generator(*args, **kwargs):
+            try:
+                yield from f(*args, **kwargs)
+            except plaid.ApiException as ex:
+                raise_plaid(ex)
+
+        return wrap_generator
+
     def wrap(*args, **kwargs):
         try:
             return f(*args, **kwargs)
@@ -100,6 +313,68 @@ def wrap_plaid_error(f):
     return wrap
 
 
+def wrap_plaid_error_async(f):
+    if inspect.isasyncgenfunction(f):
+        # errors from a generator only surface while it is being iterated
+        async def wrap_generator(*args, **kwargs):
+            try:
+                async for item in f(*args, **kwargs):
+                    yield item
+            except httpx.HTTPStatusError as ex:
+                raise_plaid(api_exception_from_response(ex.response))
+
+        return wrap_generator
+
+    async def wrap(*args, **kwargs):
+        try:
+            return await f(*args, **kwargs)
+        except httpx.HTTPStatusError as ex:
+            raise_plaid(api_exception_from_response(ex.response))
+
+    return wrap
+
+
+def api_exception_from_response(response) -> plaid.ApiException:
+    """
+    Builds the same exception the generated client raises for an error
+    response, so REST errors map through raise_plaid identically.
+    """
+    ex = plaid.ApiException(status=response.status_code, reason=response.reason_phrase)
+    ex.body = response.content
+    ex.headers = response.headers
+    return ex
+
+
+def plaid_host(environment: str) -> str:
+    # Map environment string to proper enum value
+    env_mapping = {
+        "sandbox": plaid.Environment.Sandbox,
+        "production": plaid.Environment.Production,
+    }
+
+    return env_mapping.get(environment.lower(), plaid.Environment.Production)
+
+
+@functools.lru_cache(maxsize=4)
+def get_plaid_client(
+    client_id: str, secret: str, environment: str
+) -> plaid_api.PlaidApi:
+    """
+    Returns the process-wide client for these credentials, so every PlaidAPI
+    built for them shares one urllib3 pool of kept-alive connections instead
+    of each paying for its own TCP and TLS setup.
+    """
+    configuration = plaid.Configuration(
+        host=plaid_host(environment),
+        api_key={"clientId": client_id, "secret": secret},
+    )
+    # the default pool size scales with CPU count and can be smaller than the
+    # number of concurrent callers, which would drop connections and pay for
+    # a new TLS handshake
+    configuration.connection_pool_maxsize = CONNECTION_POOL_MAXSIZE
+    return plaid_api.PlaidApi(plaid.ApiClient(configuration))
+
+
 class PlaidError(Exception):
     def __init__(self, plaid_error):
         super().__init__()
@@ -122,23 +397,15 @@ class PlaidAccountUpdateNeeded(PlaidError):
     pass
 
 
+class PlaidRateLimited(PlaidError):
+    pass
+
+
 class PlaidAPI:
     def __init__(
         self, client_id: str, secret: str, environment: str, suppress_warnings=True
     ):
-        # Map environment string to proper enum value
-        env_mapping = {
-            "sandbox": plaid.Environment.Sandbox,
-            "production": plaid.Environment.Production,
-        }
-
-        host = env_mapping.get(environment.lower(), plaid.Environment.Production)
-
-        configuration = plaid.Configuration(
-            host=host, api_key={"clientId": client_id, "secret": secret}
-        )
-        api_client = plaid.ApiClient(configuration)
-        self.client = plaid_api.PlaidApi(api_client)
+        self.client = get_plaid_client(client_id, secret, environment)
 
     @wrap_plaid_error
     def get_link_token(self, access_token=None, user_id="user") -> str:
@@ -157,7 +424,7 @@ class PlaidAPI:
 
         req_data = {
             "client_name": "plaid-sync",
-            "country_codes": [CountryCode("US")],
+            "country_codes": [_US],
             "language": "en",
             "user": user,
         }
@@ -166,10 +433,10 @@ class PlaidAPI:
         if access_token:
             req_data["access_token"] = access_token
         else:
-            req_data["products"] = [Products("transactions")]
+            req_data["products"] = _PRODUCTS_TXN
 
         req = LinkTokenCreateRequest(**req_data)
-        response = self.client.link_token_create(req)
+        response = call_with_backoff(self.client.link_token_create, req)
         return response["link_token"]
 
     @wrap_plaid_error
@@ -179,7 +446,7 @@ class PlaidAPI:
         access token.
         """
         req = ItemPublicTokenExchangeRequest(public_token=public_token)
-        response = self.client.item_public_token_exchange(req)
+        response = call_with_backoff(self.client.item_public_token_exchange, req)
         return response["access_token"]
 
     @wrap_plaid_error
@@ -194,7 +461,7 @@ class PlaidAPI:
         """
 
         req = SandboxItemResetLoginRequest(access_token=access_token)
-        return self.client.sandbox_item_reset_login(req)
+        return call_with_backoff(self.client.sandbox_item_reset_login, req)
 
     @wrap_plaid_error
     def get_item_info(self, access_token: str) -> AccountInfo:
@@ -202,7 +469,7 @@ class PlaidAPI:
         Returns account information associated with this particular access token.
         """
         req = ItemGetRequest(access_token=access_token)
-        resp = self.client.item_get(req)
+        resp = call_with_backoff(self.client.item_get, req)
         return AccountInfo(resp.to_dict())
 
     @wrap_plaid_error
@@ -211,76 +478,168 @@ class PlaidAPI:
         Returns the balances of all accounts associated with this particular access_token.
         """
         req = AccountsBalanceGetRequest(access_token=access_token)
-        resp = self.client.accounts_balance_get(req)
-        return list(map(AccountBalance, resp.to_dict()["accounts"]))
+        resp = call_with_backoff(self.client.accounts_balance_get, req)
+        return list(map(AccountBalance.from_api, resp.to_dict()["accounts"]))
 
     @wrap_plaid_error
-    def get_transactions(
+    def iter_transactions(
         self,
         access_token: str,
         start_date: datetime.date,
         end_date: datetime.date,
         account_ids: Optional[List[str]] = None,
         status_callback=None,
-    ):
-        # Import the options class
+    ) -> Iterator[List[Transaction]]:
+        """
+        Pages through /transactions/get for the date range, yielding each page
+        of transactions as it arrives so callers can handle them without
+        holding the whole range in memory.
+        """
+        if end_date < start_date:
+            # nothing can match, and Plaid would only reject the request
+            return
 
-        ret = []
+        fetched = 0
         total_transactions = None
         offset = 0
         count = 500  # Maximum allowed by Plaid API
 
-        print(start_date)
+        # built once; only the offset changes from page to page
+        options = TransactionsGetRequestOptions(count=count, offset=offset)
 
-        while True:
-            # Create options object with pagination parameters
-            options = TransactionsGetRequestOptions(count=count, offset=offset)
+        if account_ids:
+            options.account_ids = account_ids
 
-            if account_ids:
-                options.account_ids = account_ids
+        req = TransactionsGetRequest(
+            access_token=access_token,
+            start_date=start_date,
+            end_date=end_date,
+            options=options,
+        )
 
-            req = TransactionsGetRequest(
-                access_token=access_token,
-                start_date=start_date,
-                end_date=end_date,
-                options=options,
-            )
+        def fetch_page():
+            log.debug("fetching %s..%s page offset=%d", start_date, end_date, offset)
+            return executor.submit(call_with_backoff, self.client.transactions_get, req)
 
-            response = self.client.transactions_get(req)
-            response_dict = response.to_dict()
+        # the next page is requested before this one is turned into
+        # Transactions, so building them overlaps with the round trip
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        try:
+            next_page = fetch_page()
 
-            total_transactions = response_dict["total_transactions"]
-            print(total_transactions)
-            transactions_batch = [Transaction(t) for t in response_dict["transactions"]]
-            ret += transactions_batch
+            while True:
+                response = next_page.result()
 
-            if status_callback:
-                status_callback(len(ret), total_transactions)
+                total_transactions = response["total_transactions"]
+                page = response["transactions"]
+                if not page:
+                    # nothing (more) in the range
+                    break
+                fetched += len(page)
 
-            # If we got fewer transactions than requested, we've reached the end
-            if len(transactions_batch) < count or len(ret) >= total_transactions:
-                break
+                # If we got fewer transactions than requested, we've reached the end
+                last_page = len(page) < count or fetched >= total_transactions
+
+                if not last_page:
+                    # Move to the next batch; req is free to change now that
+                    # the request for this page has completed
+                    offset += count
+                    options.offset = offset
+                    next_page = fetch_page()
+
+                transactions_batch = [Transaction.from_api(t) for t in page]
+
+                if status_callback:
+                    status_callback(fetched, total_transactions)
 
-            # Move to the next batch
-            offset += count
+                yield transactions_batch
 
+                if last_page:
+                    break
+        finally:
+            # don't wait on a page prefetched for a caller that stopped early
+            executor.shutdown(wait=False)
+
+    @wrap_plaid_error
+    def get_transactions(
+        self,
+        access_token: str,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        account_ids: Optional[List[str]] = None,
+        status_callback=None,
+    ) -> List[Transaction]:
+        ret = []
+        for transactions_batch in self.iter_transactions(
+            access_token, start_date, end_date, account_ids, status_callback
+        ):
+            ret.extend(transactions_batch)
         return ret
 
+    @wrap_plaid_error
+    def iter_sync_transactions(
+        self, access_token: str, cursor: Optional[str] = None, wrap: bool = True
+    ) -> Iterator[dict]:
+        """
+        Yields each page of /transactions/sync results from the cursor as a
+        dict with the same keys as sync_transactions returns, holding just
+        that page's changes and the cursor following it.
+
+        To keep progress across a crash, save each page's changes and its
+        cursor together in one db.transaction(), so the stored cursor never
+        runs ahead of the stored changes. If Plaid fails the pagination with
+        TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION, start over from the
+        cursor it began with; the pages already saved are simply saved again.
+        """
+        has_next = True
+
+        while has_next:
+            if cursor is not None:
+                req = TransactionsSyncRequest(access_token=access_token, cursor=cursor)
+            else:
+                req = TransactionsSyncRequest(access_token=access_token)
+
+            response = call_with_backoff(self.client.transactions_sync, req)
+
+            cursor = response["next_cursor"]
+            has_next = response["has_more"]
+
+            added = response.get("added", [])
+            modified = response.get("modified", [])
+            if wrap:
+                added = [Transaction.from_api(t) for t in added]
+                modified = [Transaction.from_api(t) for t in modified]
+
+            yield {
+                "added": added,
+                "modified": modified,
+                "removed": [r.to_dict() for r in response.get("removed", [])],
+                "cursor": cursor,
+                "has_next": has_next,
+            }
+
     @wrap_plaid_error
     def sync_transactions(
         self,
         access_token: str,
         cursor: Optional[str] = None,
         status_callback=None,
+        wrap: bool = True,
     ):
         """
         Sync transactions using Plaid's /transactions/sync endpoint.
         This is more efficient than get_transactions as it only fetches updates.
 
+        Callers must persist the returned cursor, in the same transaction as
+        the returned changes, and pass it back on the next call; without it
+        every sync starts over with the full history.
+
         Args:
             access_token: The access token for the account
             cursor: Cursor from previous sync (None for initial sync)
             status_callback: Optional callback function to report progress
+            wrap: If False, added and modified hold the generated plaid
+                models as returned instead of Transaction wrappers
 
         Returns:
             dict with keys: 'added', 'modified', 'removed', 'cursor', 'has_next'
@@ -292,29 +651,315 @@ class PlaidAPI:
         current_cursor = cursor
         has_next = True
 
-        while has_next:
-            if current_cursor is not None:
-                req = TransactionsSyncRequest(
-                    access_token=access_token, cursor=current_cursor
+        for page in self.iter_sync_transactions(access_token, cursor, wrap):
+            all_added.extend(page["added"])
+            all_modified.extend(page["modified"])
+            all_removed.extend(page["removed"])
+            current_cursor = page["cursor"]
+            has_next = page["has_next"]
+
+            if status_callback:
+                status_callback(
+                    len(all_added), len(all_modified), len(all_removed), has_next
                 )
-            else:
-                req = TransactionsSyncRequest(access_token=access_token)
 
-            response = self.client.transactions_sync(req)
-            response_dict = response.to_dict()
+        return {
+            "added": all_added,
+            "modified": all_modified,
+            "removed": all_removed,
+            "cursor": current_cursor,
+            "has_next": has_next,
+        }
 
-            # Add transactions from this batch
-            batch_added = [Transaction(t) for t in response_dict.get("added", [])]
-            batch_modified = [Transaction(t) for t in response_dict.get("modified", [])]
-            batch_removed = response_dict.get("removed", [])
 
-            all_added.extend(batch_added)
-            all_modified.extend(batch_modified)
-            all_removed.extend(batch_removed)
+class AsyncPlaidAPI:
+    """
+    asyncio counterpart to PlaidAPI, calling Plaid's REST endpoints directly
+    through one pooled httpx.AsyncClient. Calls for different access tokens
+    are independent, so they can be awaited together with asyncio.gather.
 
-            # Update cursor and check if more pages exist
-            current_cursor = response_dict["next_cursor"]
-            has_next = response_dict["has_more"]
+    Returns the same wrapper objects as PlaidAPI, built from the JSON
+    responses. Requires the optional httpx package.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        secret: str,
+        environment: str,
+        suppress_warnings=True,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+    ):
+        """
+        transport replaces httpx's network transport, e.g. with an
+        httpx.MockTransport in tests.
+        """
+        if httpx is None:
+            raise ImportError("AsyncPlaidAPI requires the httpx package")
+
+        self._client = httpx.AsyncClient(
+            base_url=plaid_host(environment),
+            headers={"PLAID-CLIENT-ID": client_id, "PLAID-SECRET": secret},
+            limits=httpx.Limits(max_keepalive_connections=32),
+            timeout=REQUEST_TIMEOUT,
+            # concurrent calls share one connection instead of one each
+            http2=h2 is not None,
+            transport=transport,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _post(self, path: str, body: dict) -> dict:
+        # same backoff on 429 as call_with_backoff
+        for attempt in range(RATE_LIMIT_ATTEMPTS - 1):
+            response = await self._client.post(path, json=body)
+            if response.status_code != 429:
+                break
+            await asyncio.sleep(rate_limit_backoff(attempt))
+        else:
+            response = await self._client.post(path, json=body)
+
+        response.raise_for_status()
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+
+    @wrap_plaid_error_async
+    async def get_link_token(self, access_token=None, user_id="user") -> str:
+        """
+        See PlaidAPI.get_link_token.
+        """
+        body = {
+            "client_name": "plaid-sync",
+            "country_codes": ["US"],
+            "language": "en",
+            "user": {"client_user_id": user_id},
+        }
+
+        # if updating an existing account, the products field is not allowed
+        if access_token:
+            body["access_token"] = access_token
+        else:
+            body["products"] = ["transactions"]
+
+        response = await self._post("/link/token/create", body)
+        return response["link_token"]
+
+    @wrap_plaid_error_async
+    async def exchange_public_token(self, public_token: str) -> str:
+        """
+        See PlaidAPI.exchange_public_token.
+        """
+        response = await self._post(
+            "/item/public_token/exchange", {"public_token": public_token}
+        )
+        return response["access_token"]
+
+    @wrap_plaid_error_async
+    async def sandbox_reset_login(self, access_token: str) -> dict:
+        """
+        See PlaidAPI.sandbox_reset_login.
+        """
+        return await self._post(
+            "/sandbox/item/reset_login", {"access_token": access_token}
+        )
+
+    @wrap_plaid_error_async
+    async def get_item_info(self, access_token: str) -> AccountInfo:
+        """
+        Returns account information associated with this particular access token.
+        """
+        response = await self._post("/item/get", {"access_token": access_token})
+
+        # the generated client parses these, plain JSON leaves them as strings;
+        # parse them in place so raw_data matches PlaidAPI's too
+        item = response["item"]
+        item["consent_expiration_time"] = parse_optional_iso8601_timestamp(
+            item["consent_expiration_time"]
+        )
+        status = response["status"]["transactions"]
+        for key in ("last_failed_update", "last_successful_update"):
+            status[key] = parse_optional_iso8601_timestamp(status[key])
+
+        return AccountInfo(response)
+
+    @wrap_plaid_error_async
+    async def get_account_balance(self, access_token: str) -> List[AccountBalance]:
+        """
+        Returns the balances of all accounts associated with this particular access_token.
+        """
+        response = await self._post(
+            "/accounts/balance/get", {"access_token": access_token}
+        )
+        return list(map(AccountBalance.from_api, response["accounts"]))
+
+    @wrap_plaid_error_async
+    async def iter_transactions(
+        self,
+        access_token: str,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        account_ids: Optional[List[str]] = None,
+        status_callback=None,
+    ) -> AsyncIterator[List[Transaction]]:
+        """
+        Yields each page of /transactions/get results, in order, so callers
+        can handle them without holding the whole range in memory.
+
+        The first page reports the total, which fixes every remaining offset,
+        so the rest of the pages are requested concurrently rather than one
+        after another, keeping at most MAX_CONCURRENT_REQUESTS pages requested
+        or waiting ahead of the one the caller is on.
+        """
+        if end_date < start_date:
+            # nothing can match, and Plaid would only reject the request
+            return
+
+        count = 500  # Maximum allowed by Plaid API
+        fetched = 0
+
+        async def fetch_page(offset):
+            nonlocal fetched
+
+            options = {"count": count, "offset": offset}
+            if account_ids:
+                options["account_ids"] = account_ids
+
+            response = await self._post(
+                "/transactions/get",
+                {
+                    "access_token": access_token,
+                    "start_date": start_date.isoformat(),
+                    "end_date": end_date.isoformat(),
+                    "options": options,
+                },
+            )
+
+            transactions_batch = [
+                Transaction.from_api(t) for t in response["transactions"]
+            ]
+            fetched += len(transactions_batch)
+
+            # an empty page ends the iteration unreported, as in PlaidAPI
+            if status_callback and transactions_batch:
+                status_callback(fetched, response["total_transactions"])
+
+            return response["total_transactions"], transactions_batch
+
+        total_transactions, transactions_batch = await fetch_page(0)
+        if not transactions_batch:
+            return
+        yield transactions_batch
+
+        if len(transactions_batch) < count or fetched >= total_transactions:
+            return
+
+        # a sliding window of pages: each one handed to the caller makes room
+        # to request the next, so a slow caller doesn't end up with the whole
+        # range buffered
+        offsets = iter(range(count, total_transactions, count))
+        pages = collections.deque()
+
+        def request_next_page():
+            offset = next(offsets, None)
+            if offset is not None:
+                pages.append(asyncio.ensure_future(fetch_page(offset)))
+
+        for _ in range(MAX_CONCURRENT_REQUESTS):
+            request_next_page()
+
+        try:
+            while pages:
+                _, transactions_batch = await pages.popleft()
+                request_next_page()
+                yield transactions_batch
+        finally:
+            # the caller stopped early or a page failed
+            for page in pages:
+                page.cancel()
+
+    async def get_transactions(
+        self,
+        access_token: str,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        account_ids: Optional[List[str]] = None,
+        status_callback=None,
+    ) -> List[Transaction]:
+        ret = []
+        async for transactions_batch in self.iter_transactions(
+            access_token, start_date, end_date, account_ids, status_callback
+        ):
+            ret.extend(transactions_batch)
+        return ret
+
+    @wrap_plaid_error_async
+    async def iter_sync_transactions(
+        self, access_token: str, cursor: Optional[str] = None, wrap: bool = True
+    ) -> AsyncIterator[dict]:
+        """
+        Yields each page of /transactions/sync results from the cursor as a
+        dict with the same keys as sync_transactions returns, holding just
+        that page's changes and the cursor following it. With wrap=False the
+        added and modified transactions are left as plain dicts.
+
+        See PlaidAPI.iter_sync_transactions for saving pages as they arrive.
+        """
+        has_next = True
+
+        while has_next:
+            body = {"access_token": access_token}
+            if cursor is not None:
+                body["cursor"] = cursor
+
+            response = await self._post("/transactions/sync", body)
+
+            cursor = response["next_cursor"]
+            has_next = response["has_more"]
+
+            added = response.get("added", [])
+            modified = response.get("modified", [])
+            if wrap:
+                added = [Transaction.from_api(t) for t in added]
+                modified = [Transaction.from_api(t) for t in modified]
+
+            yield {
+                "added": added,
+                "modified": modified,
+                "removed": response.get("removed", []),
+                "cursor": cursor,
+                "has_next": has_next,
+            }
+
+    async def sync_transactions(
+        self,
+        access_token: str,
+        cursor: Optional[str] = None,
+        status_callback=None,
+        wrap: bool = True,
+    ):
+        """
+        See PlaidAPI.sync_transactions; returns a dict with the same keys.
+        """
+        all_added = []
+        all_modified = []
+        all_removed = []
+        current_cursor = cursor
+        has_next = True
+
+        async for page in self.iter_sync_transactions(access_token, cursor, wrap):
+            all_added.extend(page["added"])
+            all_modified.extend(page["modified"])
+            all_removed.extend(page["removed"])
+            current_cursor = page["cursor"]
+            has_next = page["has_next"]
 
             if status_callback:
                 status_callback(
@@ -328,3 +973,30 @@ class PlaidAPI:
             "cursor": current_cursor,
             "has_next": has_next,
         }
+
+    async def sync_all(
+        self, token_to_cursor: Dict[str, Optional[str]]
+    ) -> Dict[str, Union[dict, PlaidError, "httpx.HTTPError"]]:
+        """
+        Runs sync_transactions for every access token at once, each from its
+        own cursor (None for an initial sync). Each token's pages still follow
+        one another, as the cursor requires, but the tokens progress in
+        parallel.
+
+        Returns {access_token: result}, where result is the sync_transactions
+        dict, or the PlaidError or httpx.HTTPError (e.g. a timeout) raised for
+        that token, so one failing item doesn't discard the others.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+        async def sync_one(access_token, cursor):
+            async with semaphore:
+                try:
+                    return await self.sync_transactions(access_token, cursor)
+                except (PlaidError, httpx.HTTPError) as ex:
+                    return ex
+
+        results = await asyncio.gather(
+            *(sync_one(token, cursor) for token, cursor in token_to_cursor.items())
+        )
+        return dict(zip(token_to_cursor, results))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import datetime
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import plaidapi
+import transactionsdb
+from test_transactionsdb import make_transaction
+
+# plaid-sync.py isn't importable by name
+_spec = importlib.util.spec_from_file_location(
+    "plaid_sync", os.path.join(os.path.dirname(__file__), "plaid-sync.py")
+)
+plaid_sync = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(plaid_sync)
+
+START_DATE = datetime.date(2024, 1, 1)
+END_DATE = datetime.date(2024, 2, 1)
+
+
+class FakePlaid:
+    """
+    Stands in for PlaidAPI, serving the given pages of transactions for the
+    date range and recording what was stored as each page was requested.
+    """
+
+    def __init__(self, db, pages, error=None):
+        self.db = db
+        self.pages = pages
+        self.error = error
+        self.stored_before_page = []
+
+    def get_item_info(self, access_token):
+        return plaidapi.AccountInfo(
+            {
+                "item": {
+                    "item_id": "item",
+                    "institution_id": "ins_1",
+                    "consent_expiration_time": None,
+                },
+                "status": {
+                    "transactions": {
+                        "last_failed_update": None,
+                        "last_successful_update": None,
+                    }
+                },
+            }
+        )
+
+    def get_account_balance(self, access_token):
+        return [
+            plaidapi.AccountBalance.from_api(
+                {
+                    "account_id": "acct",
+                    "name": "Checking",
+                    "type": "depository",
+                    "subtype": "checking",
+                    "mask": "0000",
+                    "balances": {
+                        "current": 100.0,
+                        "available": 100.0,
+                        "limit": None,
+                        "iso_currency_code": "USD",
+                    },
+                }
+            )
+        ]
+
+    def iter_transactions(self, access_token, start_date, end_date, **kwargs):
+        for page in self.pages:
+            self.stored_before_page.append(stored_ids(self.db))
+            yield page
+        if self.error:
+            raise self.error
+
+
+def stored_ids(db):
+    return sorted(
+        r[0] for r in db.conn.execute("select transaction_id from transactions")
+    )
+
+
+class DateRangeSyncTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.db = transactionsdb.TransactionsDB(
+            os.path.join(tmpdir.name, "transactions.db")
+        )
+        self.addCleanup(self.db.conn.close)
+
+        with self.db.transaction():
+            self.db.save_transactions(
+                [
+                    make_transaction("kept"),
+                    make_transaction("gone-pending", pending=True),
+                    make_transaction("gone"),
+                    make_transaction("old", date="2023-06-01"),
+                    make_transaction("other", account_id="other-acct"),
+                ]
+            )
+
+    def sync(self, plaid):
+        synchronizer = plaid_sync.PlaidSynchronizer(self.db, plaid, "account", "token")
+        synchronizer.sync(START_DATE, END_DATE, use_cursor_sync=False)
+        return synchronizer
+
+    def test_sync_counts(self):
+        plaid = FakePlaid(
+            self.db,
+            [
+                [make_transaction("kept"), make_transaction("new1", pending=True)],
+                [make_transaction("new2"), make_transaction("new3")],
+            ],
+        )
+        synchronizer = self.sync(plaid)
+
+        self.assertIsNone(synchronizer.plaid_error)
+        self.assertEqual(
+            synchronizer.counts,
+            plaid_sync.SyncCounts(
+                new=3,
+                new_pending=1,
+                archived=2,
+                archived_pending=1,
+                total_fetched=4,
+                accounts=1,
+            ),
+        )
+        self.assertEqual(
+            stored_ids(self.db),
+            ["gone", "gone-pending", "kept", "new1", "new2", "new3", "old", "other"],
+        )
+        # the balance and item info are saved once all pages are in
+        self.assertEqual(
+            self.db.conn.execute("select item_id from items").fetchall(), [("item",)]
+        )
+        self.assertEqual(
+            self.db.conn.execute("select account_id from balances").fetchall(),
+            [("acct",)],
+        )
+
+    def test_pages_are_saved_as_they_arrive(self):
+        plaid = FakePlaid(
+            self.db,
+            [
+                [make_transaction("new1")],
+                [make_transaction("new1"), make_transaction("new2")],
+            ],
+        )
+        synchronizer = self.sync(plaid)
+
+        # new1 was saved before the second page was requested
+        self.assertEqual(
+            plaid.stored_before_page[0],
+            sorted(["kept", "gone-pending", "gone", "old", "other"]),
+        )
+        self.assertIn("new1", plaid.stored_before_page[1])
+        self.assertEqual(synchronizer.counts.new, 2)
+        self.assertEqual(synchronizer.counts.total_fetched, 2)
+
+    def test_plaid_error_keeps_saved_pages(self):
+        error = plaidapi.PlaidAccountUpdateNeeded(
+            plaidapi.plaid.ApiException(status=400, reason="Bad Request")
+        )
+        plaid = FakePlaid(self.db, [[make_transaction("new1")]], error=error)
+        synchronizer = self.sync(plaid)
+
+        self.assertIs(synchronizer.plaid_error, error)
+        self.assertIn("new1", stored_ids(self.db))
+        self.assertEqual(self.db.conn.execute("select * from items").fetchall(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+
+import asyncio
+import datetime
+import json
+import unittest
+from unittest import mock
+
+import plaidapi
+
+TOTAL_TRANSACTIONS = 1234
+
+
+def transaction_json(i: int) -> dict:
+    return {
+        "account_id": "acct",
+        "date": "2024-01-05",
+        "transaction_id": "t%d" % i,
+        "pending": i % 3 == 0,
+        "merchant_name": "Uber",
+        "amount": 12.5,
+        "iso_currency_code": "USD",
+        "personal_finance_category": {"primary": "TRAVEL"},
+    }
+
+
+def error_response(status: int, error_type: str, error_code: str):
+    return plaidapi.httpx.Response(
+        status, json={"error_type": error_type, "error_code": error_code}
+    )
+
+
+def api_exception(status: int, error_code: str):
+    ex = plaidapi.plaid.ApiException(status=status, reason="Bad Request")
+    ex.body = json.dumps({"error_code": error_code})
+    return ex
+
+
+class FakeClient:
+    """
+    Stands in for the generated plaid client, serving /transactions/get pages
+    and failing every request from fail_at_offset on with the given error.
+    """
+
+    def __init__(self, fail_at_offset=None, error=None):
+        self.fail_at_offset = fail_at_offset
+        self.error = error
+        self.offsets = []
+
+    def transactions_get(self, req):
+        offset, count = req.options.offset, req.options.count
+        self.offsets.append(offset)
+        if self.fail_at_offset is not None and offset >= self.fail_at_offset:
+            raise self.error
+
+        end = min(offset + count, TOTAL_TRANSACTIONS)
+        return {
+            "total_transactions": TOTAL_TRANSACTIONS,
+            "transactions": [transaction_json(i) for i in range(offset, end)],
+        }
+
+
+class PlaidAPITest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(plaidapi, "rate_limit_backoff", return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def iter_transactions(self, client):
+        api = plaidapi.PlaidAPI("client", "secret", "sandbox")
+        api.client = client
+        return api.iter_transactions(
+            "token", datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)
+        )
+
+    def test_iter_transactions_pages(self):
+        client = FakeClient()
+        pages = list(self.iter_transactions(client))
+
+        self.assertEqual([len(page) for page in pages], [500, 500, 234])
+        self.assertEqual(
+            [t.transaction_id for page in pages for t in page],
+            ["t%d" % i for i in range(TOTAL_TRANSACTIONS)],
+        )
+        self.assertEqual(client.offsets, [0, 500, 1000])
+
+    def test_iter_transactions_error_mapping(self):
+        for status, error_code, error in [
+            (400, "ITEM_LOGIN_REQUIRED", plaidapi.PlaidAccountUpdateNeeded),
+            (400, "NO_ACCOUNTS", plaidapi.PlaidNoApplicableAccounts),
+            (500, "INTERNAL_SERVER_ERROR", plaidapi.PlaidUnknownError),
+            (429, "TRANSACTIONS_LIMIT", plaidapi.PlaidRateLimited),
+        ]:
+            with self.subTest(error_code=error_code):
+                client = FakeClient(500, api_exception(status, error_code))
+                pages = self.iter_transactions(client)
+
+                # the failing page was prefetched, but its error only surfaces
+                # when the caller asks for it
+                self.assertEqual(len(next(pages)), 500)
+                with self.assertRaises(error):
+                    next(pages)
+
+
+@unittest.skipIf(plaidapi.httpx is None, "AsyncPlaidAPI requires httpx")
+class AsyncPlaidAPITest(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        self.rate_limited = 0
+        # don't actually wait between rate limited attempts
+        patcher = mock.patch.object(plaidapi, "rate_limit_backoff", return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def handle(self, request):
+        body = json.loads(request.content)
+        self.requests.append((request.url.path, body))
+
+        if self.rate_limited:
+            self.rate_limited -= 1
+            return error_response(429, "RATE_LIMIT_EXCEEDED", "TRANSACTIONS_LIMIT")
+
+        token = body.get("access_token")
+        if token == "login-required":
+            return error_response(400, "ITEM_ERROR", "ITEM_LOGIN_REQUIRED")
+        if token == "no-accounts":
+            return error_response(400, "ITEM_ERROR", "NO_ACCOUNTS")
+        if token == "broken":
+            return error_response(500, "API_ERROR", "INTERNAL_SERVER_ERROR")
+        if token == "timeout":
+            raise plaidapi.httpx.ReadTimeout("timed out", request=request)
+
+        if request.url.path == "/transactions/get":
+            offset, count = body["options"]["offset"], body["options"]["count"]
+            end = min(offset + count, TOTAL_TRANSACTIONS)
+            return plaidapi.httpx.Response(
+                200,
+                json={
+                    "total_transactions": TOTAL_TRANSACTIONS,
+                    "transactions": [transaction_json(i) for i in range(offset, end)],
+                },
+            )
+        if request.url.path == "/transactions/sync":
+            page = int(body.get("cursor") or 0)
+            return plaidapi.httpx.Response(
+                200,
+                json={
+                    "added": [transaction_json(page * 10 + i) for i in range(10)],
+                    "modified": [],
+                    "removed": [{"transaction_id": "removed%d" % page}],
+                    "next_cursor": str(page + 1),
+                    "has_more": page < 2,
+                },
+            )
+        if request.url.path == "/item/get":
+            return plaidapi.httpx.Response(
+                200,
+                json={
+                    "item": {
+                        "item_id": "item",
+                        "institution_id": "ins_1",
+                        "consent_expiration_time": "2024-06-01T00:00:00Z",
+                    },
+                    "status": {
+                        "transactions": {
+                            "last_failed_update": None,
+                            "last_successful_update": "2024-01-05T10:20:30.12Z",
+                        }
+                    },
+                },
+            )
+        return plaidapi.httpx.Response(404)
+
+    def run_with_api(self, call):
+        async def run():
+            transport = plaidapi.httpx.MockTransport(self.handle)
+            async with plaidapi.AsyncPlaidAPI(
+                "client", "secret", "sandbox", transport=transport
+            ) as api:
+                return await call(api)
+
+        return asyncio.run(run())
+
+    def get_transactions(self, access_token="token", **kwargs):
+        return self.run_with_api(
+            lambda api: api.get_transactions(
+                access_token,
+                datetime.date(2024, 1, 1),
+                datetime.date(2024, 2, 1),
+                **kwargs
+            )
+        )
+
+    def test_get_transactions_pages_in_order(self):
+        progress = []
+        transactions = self.get_transactions(
+            status_callback=lambda fetched, total: progress.append((fetched, total))
+        )
+
+        self.assertEqual(
+            [t.transaction_id for t in transactions],
+            ["t%d" % i for i in range(TOTAL_TRANSACTIONS)],
+        )
+        self.assertEqual(
+            sorted(body["options"]["offset"] for _, body in self.requests),
+            [0, 500, 1000],
+        )
+        self.assertEqual(progress[-1], (TOTAL_TRANSACTIONS, TOTAL_TRANSACTIONS))
+
+    def test_transactions_match_plaid_api_types(self):
+        transaction = self.get_transactions()[0]
+
+        self.assertEqual(transaction.date, datetime.date(2024, 1, 5))
+        self.assertEqual(transaction.personal_finance_category, {"primary": "TRAVEL"})
+        self.assertEqual(
+            transaction, plaidapi.Transaction.from_api(transaction.raw_data)
+        )
+
+    def test_empty_date_range(self):
+        progress = []
+        transactions = self.run_with_api(
+            lambda api: api.get_transactions(
+                "token",
+                datetime.date(2024, 2, 1),
+                datetime.date(2024, 1, 1),
+                status_callback=lambda *args: progress.append(args),
+            )
+        )
+
+        self.assertEqual(transactions, [])
+        self.assertEqual(self.requests, [])
+        self.assertEqual(progress, [])
+
+    def test_rate_limited_request_is_retried(self):
+        self.rate_limited = plaidapi.RATE_LIMIT_ATTEMPTS - 1
+        transactions = self.get_transactions()
+
+        self.assertEqual(len(transactions), TOTAL_TRANSACTIONS)
+        self.assertEqual(len(self.requests), plaidapi.RATE_LIMIT_ATTEMPTS - 1 + 3)
+
+    def test_rate_limit_gives_up(self):
+        self.rate_limited = plaidapi.RATE_LIMIT_ATTEMPTS
+
+        with self.assertRaises(plaidapi.PlaidRateLimited):
+            self.get_transactions()
+        self.assertEqual(len(self.requests), plaidapi.RATE_LIMIT_ATTEMPTS)
+
+    def test_error_mapping(self):
+        for access_token, error in [
+            ("login-required", plaidapi.PlaidAccountUpdateNeeded),
+            ("no-accounts", plaidapi.PlaidNoApplicableAccounts),
+            ("broken", plaidapi.PlaidUnknownError),
+        ]:
+            with self.subTest(access_token=access_token):
+                with self.assertRaises(error):
+                    self.get_transactions(access_token)
+                with self.assertRaises(error):
+                    self.run_with_api(lambda api: api.get_item_info(access_token))
+
+    def test_get_item_info_parses_timestamps(self):
+        item_info = self.run_with_api(lambda api: api.get_item_info("token"))
+
+        utc = datetime.timezone.utc
+        self.assertEqual(
+            item_info.ts_consent_expiration, datetime.datetime(2024, 6, 1, tzinfo=utc)
+        )
+        self.assertIsNone(item_info.ts_last_failed_update)
+        self.assertEqual(
+            item_info.ts_last_successful_update,
+            datetime.datetime(2024, 1, 5, 10, 20, 30, tzinfo=utc),
+        )
+
+    def test_sync_all(self):
+        results = self.run_with_api(
+            lambda api: api.sync_all(
+                {"token": None, "other": "2", "broken": None, "timeout": None}
+            )
+        )
+
+        self.assertEqual(len(results["token"]["added"]), 30)
+        self.assertEqual(results["token"]["cursor"], "3")
+        self.assertFalse(results["token"]["has_next"])
+        self.assertEqual(len(results["other"]["added"]), 10)
+        self.assertIsInstance(results["broken"], plaidapi.PlaidUnknownError)
+        self.assertIsInstance(results["timeout"], plaidapi.httpx.TimeoutException)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import datetime
+import os
+import tempfile
+import threading
+import unittest
+
+import plaidapi
+import transactionsdb
+
+
+def make_transaction(
+    transaction_id: str,
+    account_id: str = "acct",
+    date: str = "2024-01-05",
+    pending: bool = False,
+) -> plaidapi.Transaction:
+    return plaidapi.Transaction.from_api(
+        {
+            "account_id": account_id,
+            "date": date,
+            "transaction_id": transaction_id,
+            "pending": pending,
+            "merchant_name": "Uber",
+            "amount": 12.5,
+            "iso_currency_code": "USD",
+        }
+    )
+
+
+class TransactionsDBTest(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dbfile = os.path.join(tmpdir.name, "transactions.db")
+        self.db = transactionsdb.TransactionsDB(self.dbfile)
+        self.addCleanup(self.db.conn.close)
+
+    def stored_ids(self):
+        return sorted(
+            r[0]
+            for r in self.db.conn.execute("select transaction_id from transactions")
+        )
+
+    def test_transaction_commits(self):
+        with self.db.transaction():
+            self.db.save_transactions([make_transaction("t1"), make_transaction("t2")])
+            self.assertTrue(self.db.conn.in_transaction)
+
+        self.assertFalse(self.db.conn.in_transaction)
+        self.assertEqual(self.stored_ids(), ["t1", "t2"])
+
+    def test_transaction_rolls_back(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.save_transaction(make_transaction("t1"))
+                raise RuntimeError("sync failed")
+
+        self.assertFalse(self.db.conn.in_transaction)
+        self.assertEqual(self.stored_ids(), [])
+
+    def test_nested_transaction_rolls_back_to_savepoint(self):
+        with self.db.transaction():
+            self.db.save_transaction(make_transaction("t1"))
+            with self.assertRaises(RuntimeError):
+                with self.db.transaction():
+                    self.db.save_transaction(make_transaction("t2"))
+                    raise RuntimeError("page failed")
+            # the outer transaction is still open and keeps going
+            self.assertTrue(self.db.conn.in_transaction)
+            with self.db.transaction():
+                self.db.save_transaction(make_transaction("t3"))
+
+        self.assertEqual(self.stored_ids(), ["t1", "t3"])
+
+    def test_concurrent_writers(self):
+        threads = 8
+        per_thread = 50
+        connections = {}
+        errors = []
+        start = threading.Barrier(threads)
+
+        def writer(n):
+            try:
+                connections[n] = self.db.conn
+                start.wait()
+                for i in range(per_thread):
+                    with self.db.transaction():
+                        # a read before the write mustn't deadlock with the
+                        # other writers
+                        self.db.conn.execute("select count(*) from transactions")
+                        self.db.save_transaction(make_transaction("t%d-%d" % (n, i)))
+                self.db.conn.close()
+            except Exception as ex:
+                errors.append(ex)
+
+        workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        # each thread opened its own connection
+        self.assertEqual(len({id(conn) for conn in connections.values()}), threads)
+        self.assertNotIn(self.db.conn, connections.values())
+        self.assertEqual(len(self.stored_ids()), threads * per_thread)
+
+    def test_lookup_queries(self):
+        with self.db.transaction():
+            self.db.save_transactions(
+                [
+                    make_transaction("stored", pending=True),
+                    make_transaction("archived"),
+                    make_transaction("old", date="2023-06-01"),
+                    make_transaction("other", account_id="other-acct"),
+                    make_transaction("gone", pending=True),
+                    make_transaction("gone-posted"),
+                ]
+            )
+            self.db.archive_transactions(["archived"])
+
+        start, end = datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)
+
+        self.db.load_transaction_id_lookup(["stored", "archived", "old", "new"])
+        self.assertEqual(self.db.get_stored_lookup_ids(start, end), ["stored"])
+        self.assertEqual(
+            self.db.get_pending_not_in_lookup(start, end, ["acct"]),
+            {"gone": True, "gone-posted": False},
+        )
+
+        # loading replaces what the table held
+        self.db.load_transaction_id_lookup(["gone"])
+        self.assertEqual(self.db.get_stored_lookup_ids(start, end), ["gone"])
+        self.assertEqual(
+            self.db.get_pending_not_in_lookup(start, end, ["acct", "other-acct"]),
+            {"stored": True, "gone-posted": False, "other": False},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
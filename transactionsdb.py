@@ -3,21 +3,111 @@
 import sqlite3
 import json
 import datetime
+import itertools
+import sys
+import threading
+import urllib.parse
+from contextlib import contextmanager
 
-from typing import List
+from typing import Dict, Iterable, List, Optional
 
 from plaidapi import AccountBalance, AccountInfo, Transaction as PlaidTransaction
 
+# rows bound per executemany call when saving transactions
+SAVE_BATCH_SIZE = 500
+
 
 def build_placeholders(list):
     return ",".join(["?"] * len(list))
 
 
+def load_extension(path: str) -> Optional[sqlite3.Connection]:
+    """
+    Loads a SQLite extension into a new in-memory connection and returns that
+    connection, or None (with a warning) if it can't be loaded - not every
+    Python build allows loading extensions. Anything the extension registers,
+    such as a VFS, is process wide, but it is unloaded again when the returned
+    connection is closed, so keep it open for as long as it's needed.
+    """
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.enable_load_extension(True)
+        conn.load_extension(path)
+        conn.enable_load_extension(False)
+    except (AttributeError, sqlite3.Error) as ex:
+        conn.close()
+        print(
+            f"Unable to load SQLite extension [{path}], using defaults: {ex}",
+            file=sys.stderr,
+        )
+        return None
+    return conn
+
+
 class TransactionsDB:
-    def __init__(self, dbfile: str):
-        self.conn = sqlite3.connect(dbfile)
+    # statements used on the save paths, kept as constants so every call
+    # binds against the same text and hits sqlite3's prepared statement cache
+    _INSERT_TX_SQL = """
+        insert into
+            transactions(account_id, transaction_id, created, updated, archived, plaid_json)
+            values(?,?,strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),null,?)
+            on conflict(account_id, transaction_id) DO UPDATE
+                set updated    = strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),
+                    plaid_json = excluded.plaid_json
+    """
+
+    _INSERT_ITEM_SQL = """
+        insert into
+            items(item_id, institution_id, consent_expiration, last_failed_update, last_successful_update, updated, plaid_json)
+            values(?,?,?,?,?,strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),?)
+            on conflict(item_id) DO UPDATE
+                set updated    = strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),
+                institution_id = excluded.institution_id,
+                consent_expiration = excluded.consent_expiration,
+                last_failed_update = excluded.last_failed_update,
+                last_successful_update = excluded.last_successful_update,
+                plaid_json = excluded.plaid_json
+    """
+
+    _INSERT_BALANCE_SQL = """
+        insert into
+            balances(date, item_id, account_id, account_type, balance_current, balance_available, balance_limit, currency_code, updated, plaid_json)
+            values(strftime('%Y-%m-%d', 'now'),?,?,?,?,?,?,?,strftime('%Y-%m-%dT%H:%M:%SZ', 'now'), ?)
+            on conflict(item_id, account_id, date) DO UPDATE
+                set updated    = strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),
+                    account_type = excluded.account_type,
+                    balance_current = excluded.balance_current,
+                    balance_available = excluded.balance_available,
+                    balance_limit = excluded.balance_limit,
+                    currency_code = excluded.currency_code,
+                    plaid_json = excluded.plaid_json
+    """
+
+    _UPDATE_CURSOR_SQL = "UPDATE items SET cursor = ? WHERE item_id = ?"
+
+    def __init__(
+        self,
+        dbfile: str,
+        vfs: Optional[str] = None,
+        vfs_extension: Optional[str] = None,
+    ):
+        self.dbfile = dbfile
+        # sqlite3 connections can't be shared between threads, so each thread
+        # syncing an account gets its own; writes are serialized on the lock
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+
+        # an alternate VFS is opt-in; if its extension can't be loaded or the
+        # VFS isn't registered, the default VFS is used instead
+        self.vfs = vfs
+        self._vfs_loader = None
+        if vfs_extension:
+            self._vfs_loader = load_extension(vfs_extension)
+            if self._vfs_loader is None:
+                self.vfs = None
 
         c = self.conn.cursor()
+
         c.execute("""
             create table if not exists transactions
                 (account_id, transaction_id, created, updated, archived, plaid_json)
@@ -43,8 +133,6 @@ class TransactionsDB:
         """)
         c.execute("create unique index if not exists items_idx ON items(item_id)")
 
-        self.conn.commit()
-
         # This might be needed if there's not consistent support for json_extract in sqlite3 installations
         # this will need to be modified to support the "$.prop" syntax
         # def json_extract(json_str, prop):
@@ -52,27 +140,97 @@ class TransactionsDB:
         #    return ret
         # self.conn.create_function("json_extract", 2, json_extract)
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.vfs:
+            try:
+                return self._configure(
+                    sqlite3.connect(
+                        f"file:{urllib.parse.quote(self.dbfile)}?vfs={self.vfs}",
+                        isolation_level=None,
+                        uri=True,
+                    )
+                )
+            except sqlite3.OperationalError as ex:
+                # e.g. "no such vfs" when nothing registered it
+                print(
+                    f"Unable to open database with SQLite VFS [{self.vfs}], using defaults: {ex}",
+                    file=sys.stderr,
+                )
+                self.vfs = None
+
+        return self._configure(sqlite3.connect(self.dbfile, isolation_level=None))
+
+    @staticmethod
+    def _configure(conn: sqlite3.Connection) -> sqlite3.Connection:
+        # autocommit mode (isolation_level=None) - multi-statement writes are
+        # grouped explicitly through transaction() so a sync commits once
+        # rather than per row
+        try:
+            # WAL + synchronous=NORMAL only syncs on checkpoint rather than on
+            # every commit, and readers don't block the writer
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.execute("PRAGMA mmap_size=268435456")
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def _write_cursor(self) -> sqlite3.Cursor:
+        """
+        Cursor shared by the save_* methods on this thread's connection, so a
+        sync's inserts reuse it instead of allocating a cursor per call.
+        """
+        c = getattr(self._local, "write_cursor", None)
+        if c is None:
+            c = self._local.write_cursor = self.conn.cursor()
+        return c
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups every write issued inside the block into a single transaction,
+        committed on exit or rolled back if an exception escapes.
+
+        BEGIN IMMEDIATE takes the write lock up front so a read earlier in the
+        block can't deadlock trying to upgrade. If a transaction is already
+        open, a savepoint is used instead so blocks can nest. Only one thread
+        holds a write transaction at a time.
+        """
+        if self.conn.in_transaction:
+            self.conn.execute("SAVEPOINT plaid_sync")
+            try:
+                yield self
+            except BaseException:
+                self.conn.execute("ROLLBACK TO SAVEPOINT plaid_sync")
+                self.conn.execute("RELEASE SAVEPOINT plaid_sync")
+                raise
+            self.conn.execute("RELEASE SAVEPOINT plaid_sync")
+            return
+
+        with self._write_lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
     def datetime_handler(self, obj):
         if isinstance(obj, (datetime.datetime, datetime.date)):
             return obj.isoformat()
         raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
-    def get_transaction_ids(
-        self, start_date: datetime.date, end_date: datetime.date, account_ids: List[str]
-    ) -> List[str]:
-        c = self.conn.cursor()
-        res = c.execute(
-            """
-                select transaction_id from transactions
-                where json_extract(plaid_json, '$.date') between ? and ?
-                and account_id in ({PARAMS})
-                and archived is null
-            """.replace("{PARAMS}", build_placeholders(account_ids)),
-            [start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")]
-            + list(account_ids),
-        )
-        return [r[0] for r in res.fetchall()]
-
     def archive_transactions(self, transaction_ids: List[str]):
         c = self.conn.cursor()
         c.execute(
@@ -84,42 +242,35 @@ class TransactionsDB:
             list(transaction_ids),
         )
 
-        self.conn.commit()
-
     def save_transaction(self, transaction: PlaidTransaction):
-        c = self.conn.cursor()
-        data = json.dumps(transaction.raw_data, default=self.datetime_handler)
-        c.execute(
-            """
-            insert into
-                transactions(account_id, transaction_id, created, updated, archived, plaid_json)
-                values(?,?,strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),null,?)
-                on conflict(account_id, transaction_id) DO UPDATE
-                    set updated    = strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),
-                        plaid_json = excluded.plaid_json
-        """,
-            [transaction.account_id, transaction.transaction_id, data],
-        )
+        self.save_transactions([transaction])
 
-        self.conn.commit()
+    def save_transactions(self, transactions: Iterable[PlaidTransaction]):
+        """
+        Inserts or updates transactions in batches with executemany, so a
+        large sync only crosses into SQLite once per batch instead of per row.
+        """
+        c = self._write_cursor()
+        transactions = iter(transactions)
+        while True:
+            batch = [
+                (
+                    t.account_id,
+                    t.transaction_id,
+                    json.dumps(t.raw_data, default=self.datetime_handler),
+                )
+                for t in itertools.islice(transactions, SAVE_BATCH_SIZE)
+            ]
+            if not batch:
+                break
+            c.executemany(self._INSERT_TX_SQL, batch)
 
     def save_item_info(self, item_info: AccountInfo):
-        c = self.conn.cursor()
+        c = self._write_cursor()
 
         data = json.dumps(item_info.raw_data, default=self.datetime_handler)
         c.execute(
-            """
-            insert into
-                items(item_id, institution_id, consent_expiration, last_failed_update, last_successful_update, updated, plaid_json)
-                values(?,?,?,?,?,strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),?)
-                on conflict(item_id) DO UPDATE
-                    set updated    = strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),
-                    institution_id = excluded.institution_id,
-                    consent_expiration = excluded.consent_expiration,
-                    last_failed_update = excluded.last_failed_update,
-                    last_successful_update = excluded.last_successful_update,
-                    plaid_json = excluded.plaid_json
-        """,
+            self._INSERT_ITEM_SQL,
             [
                 item_info.item_id,
                 item_info.institution_id,
@@ -130,52 +281,98 @@ class TransactionsDB:
             ],
         )
 
-        self.conn.commit()
-
     def save_balance(self, item_id: str, balance: AccountBalance):
-        c = self.conn.cursor()
+        self.save_balances(item_id, [balance])
 
-        data = json.dumps(balance.raw_data, default=self.datetime_handler)
-        c.execute(
-            """
-            insert into
-                balances(date, item_id, account_id, account_type, balance_current, balance_available, balance_limit, currency_code, updated, plaid_json)
-                values(strftime('%Y-%m-%d', 'now'),?,?,?,?,?,?,?,strftime('%Y-%m-%dT%H:%M:%SZ', 'now'), ?)
-                on conflict(item_id, account_id, date) DO UPDATE
-                    set updated    = strftime('%Y-%m-%dT%H:%M:%SZ', 'now'),
-                        account_type = excluded.account_type,
-                        balance_current = excluded.balance_current,
-                        balance_available = excluded.balance_available,
-                        balance_limit = excluded.balance_limit,
-                        currency_code = excluded.currency_code,
-                        plaid_json = excluded.plaid_json
-        """,
+    def save_balances(self, item_id: str, balances: Iterable[AccountBalance]):
+        c = self._write_cursor()
+        c.executemany(
+            self._INSERT_BALANCE_SQL,
             [
-                item_id,
-                balance.account_id,
-                balance.account_type,
-                balance.balance_current,
-                balance.balance_available,
-                balance.balance_limit,
-                balance.currency_code,
-                data,
+                (
+                    item_id,
+                    balance.account_id,
+                    balance.account_type,
+                    balance.balance_current,
+                    balance.balance_available,
+                    balance.balance_limit,
+                    balance.currency_code,
+                    json.dumps(balance.raw_data, default=self.datetime_handler),
+                )
+                for balance in balances
             ],
         )
 
-        self.conn.commit()
+    def load_transaction_id_lookup(self, transaction_ids: Iterable[str]):
+        """
+        Fills the connection's temporary tids_lookup table with the given ids,
+        replacing whatever it held, so queries can join against it rather than
+        binding one parameter per id.
+
+        The table is private to the connection, so this doesn't need
+        transaction()'s write lock; a plain BEGIN just keeps the inserts to one
+        transaction rather than one each.
+        """
+        c = self.conn.cursor()
+        c.execute("create temp table if not exists tids_lookup (tid TEXT PRIMARY KEY)")
+
+        in_transaction = self.conn.in_transaction
+        if not in_transaction:
+            c.execute("BEGIN")
+        try:
+            c.execute("delete from tids_lookup")
+            c.executemany(
+                "insert or ignore into tids_lookup(tid) values(?)",
+                ((tid,) for tid in transaction_ids),
+            )
+        except BaseException:
+            if not in_transaction:
+                c.execute("ROLLBACK")
+            raise
+        if not in_transaction:
+            c.execute("COMMIT")
+
+    def get_stored_lookup_ids(
+        self, start_date: datetime.date, end_date: datetime.date
+    ) -> List[str]:
+        """
+        Returns the ids loaded by load_transaction_id_lookup that are already
+        stored, unarchived and dated within the range.
+        """
+        c = self.conn.cursor()
+        res = c.execute(
+            """
+                select t.transaction_id from transactions t
+                join tids_lookup l on t.transaction_id = l.tid
+                where json_extract(t.plaid_json, '$.date') between ? and ?
+                and t.archived is null
+            """,
+            [start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")],
+        )
+        return [r[0] for r in res.fetchall()]
 
-    def fetch_transactions_by_id(
-        self, transaction_ids: List[str]
-    ) -> List[PlaidTransaction]:
+    def get_pending_not_in_lookup(
+        self, start_date: datetime.date, end_date: datetime.date, account_ids: List[str]
+    ) -> Dict[str, bool]:
+        """
+        Returns {transaction_id: pending} for the stored, unarchived
+        transactions of the accounts dated within the range whose ids were not
+        loaded by load_transaction_id_lookup.
+        """
         c = self.conn.cursor()
-        r = c.execute(
+        res = c.execute(
             """
-            select plaid_json from transactions
-            where transaction_id in ({PARAMS})
-        """.replace("{PARAMS}", build_placeholders(transaction_ids)),
-            list(transaction_ids),
+                select transaction_id, json_extract(plaid_json, '$.pending')
+                from transactions
+                where json_extract(plaid_json, '$.date') between ? and ?
+                and account_id in ({PARAMS})
+                and archived is null
+                and transaction_id not in (select tid from tids_lookup)
+            """.replace("{PARAMS}", build_placeholders(account_ids)),
+            [start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")]
+            + list(account_ids),
         )
-        return [PlaidTransaction(json.loads(d[0])) for d in r.fetchall()]
+        return {tid: bool(pending) for tid, pending in res}
 
     def get_last_sync_cursor(self, item_id):
         """
@@ -196,6 +393,5 @@ class TransactionsDB:
         Save the sync cursor for a given item_id.
         Updates the existing item record with the new cursor.
         """
-        c = self.conn.cursor()
-        c.execute("UPDATE items SET cursor = ? WHERE item_id = ?", (cursor, item_id))
-        self.conn.commit()
+        c = self._write_cursor()
+        c.execute(self._UPDATE_CURSOR_SQL, (cursor, item_id))